@@ -2,9 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import os, re, csv, time, json
+import http.client
 from html import unescape
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, parse_qs
+
+from rem_http import REDIRECCIONES, PoolConexiones
 
 BASE = "https://clima.sanluis.gob.ar"
 URL_INDEX = f"{BASE}/Index.aspx"
@@ -12,34 +15,98 @@ R_TIMEOUT = 20
 RETRIES = 3
 SLEEP_BETWEEN = 0.2  # cortesía con el servidor
 
+# regex precompiladas (se usan en cada estación)
+_RE_HEM = re.compile(r"(Sur|Norte|Oeste|Este)", re.I)
+_RE_DEG = re.compile(r"^\s*(\d+)")
+_RE_MIN = re.compile(r"^\s*\d+\D+(\d+)")
+_RE_SEC = re.compile(r"\d+\D+\d+\D+(\d+[.,]?\d*)")  # segundos con coma o punto
+# una sola pasada sobre el HTML para los tres labels y para las variables JS
+_RE_COORDS = re.compile(
+    r'id="ContentPlaceHolder1_lbl(?P<k>Latitud|Longitud|Altura)"[^>]*>(?P<v>[^<]+)</label>'
+)
+_RE_JS = re.compile(r'var\s+(Estacion(?:Lat|Lon|Nombre))\s*=\s*("(?:[^"\\]|\\.)*"|[^;]+);')
+_RE_DECIMAL_JS = re.compile(r"-?\d+\.\d+")  # único formato aceptado en EstacionLat/EstacionLon
+_RE_NUMERO = re.compile(r"(\d+[.,]?\d*)")
+_RE_TITULO = re.compile(r'id="ContentPlaceHolder1_Titulo"[^>]*>\s*([^<]+)\s*</h1>')
+_PREFIJO_TITULO = "datos de la estación:"  # se compara en minúsculas
+
+UA = "Mozilla/5.0 (compatible; CoordenadasBot/1.0; +bomberos.ar)"
+
+# una sola conexión HTTPS persistente (keep-alive entre páginas)
+POOL = PoolConexiones(1, UA)
+
 def http_get(url: str, tries: int = RETRIES, timeout: int = R_TIMEOUT) -> str:
-    ua = "Mozilla/5.0 (compatible; CoordenadasBot/1.0; +bomberos.ar)"
-    req = Request(url, headers={"User-Agent": ua})
     last_err = None
     for _ in range(tries):
         try:
-            with urlopen(req, timeout=timeout) as r:
-                data = r.read()
-            return data.decode("utf-8", errors="ignore")
-        except (URLError, HTTPError) as e:
+            status, _, data = POOL.get(url, timeout)
+            if status == 200:
+                return data.decode("utf-8", errors="ignore")
+            last_err = http.client.HTTPException(f"HTTP {status} en {url}")
+            if status in REDIRECCIONES:
+                # redirección no seguida: reintentar daría lo mismo
+                break
+        except (http.client.HTTPException, OSError) as e:
             last_err = e
-            time.sleep(0.5)
+        time.sleep(0.5)
     raise last_err
 
+class EnlacesEstacionParser(HTMLParser):
+    """Junta los <a href="/Estacion.aspx?Estacion=N">Nombre</a> en self.estaciones {id -> nombre}."""
+
+    def __init__(self):
+        super().__init__()  # convert_charrefs: el texto llega con las entidades ya resueltas
+        self.estaciones = {}
+        self._actual = None  # (id, [fragmentos de texto]) del <a> abierto
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        partes = urlsplit(dict(attrs).get("href") or "")
+        if partes.path != "/Estacion.aspx":
+            return
+        valores = parse_qs(partes.query).get("Estacion")
+        if valores and valores[0].isdigit():
+            self._actual = (int(valores[0]), [])
+
+    def handle_data(self, data):
+        if self._actual is not None:
+            self._actual[1].append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._actual is not None:
+            est_id, textos = self._actual
+            nombre = "".join(textos).strip()
+            if nombre:
+                self.estaciones[est_id] = nombre
+            self._actual = None
+
 def descubrir_estaciones():
     """Devuelve dict {id:int -> nombre:str} desde Index.aspx (REM + SLA)."""
-    html = http_get(URL_INDEX)
-    estaciones = {}
-    for m in re.finditer(r"href=['\"]/Estacion\.aspx\?Estacion=(\d+)['\"]>([^<]+)</a>", html):
-        est_id = int(m.group(1))
-        nombre = unescape(m.group(2)).strip()
-        if nombre:
-            estaciones[est_id] = nombre
-    return estaciones
-
-def js_var(html: str, name: str, pat=r"(.+?)"):
-    m = re.search(rf"var\s+{name}\s*=\s*{pat};", html)
-    return m.group(1) if m else None
+    parser = EnlacesEstacionParser()
+    parser.feed(http_get(URL_INDEX))
+    parser.close()
+    return parser.estaciones
+
+def variables_js(html: str) -> dict:
+    """
+    {'EstacionLat': '...', 'EstacionLon': '...', 'EstacionNombre': '"..."'} (valores
+    crudos, primera aparición). Lat/Lon sólo se toman si son decimales.
+    """
+    vals = {}
+    for m in _RE_JS.finditer(html):
+        nombre, valor = m.group(1), m.group(2).strip()
+        if nombre != "EstacionNombre" and not _RE_DECIMAL_JS.fullmatch(valor):
+            continue  # p.ej. null o '-32.5': se ignora y se sigue buscando
+        vals.setdefault(nombre, valor)
+    return vals
+
+def labels_coordenadas(html: str) -> dict:
+    """{'Latitud': txt, 'Longitud': txt, 'Altura': txt} desde los <label> del DOM (primera aparición)."""
+    vals = {}
+    for m in _RE_COORDS.finditer(html):
+        vals.setdefault(m.group("k"), m.group("v"))
+    return vals
 
 def dms_to_decimal(txt: str):
     """
@@ -50,14 +117,14 @@ def dms_to_decimal(txt: str):
         if not txt:
             return None
         t = unescape(txt).strip()
-        hem_m = re.search(r"(Sur|Norte|Oeste|Este)", t, flags=re.I)
+        hem_m = _RE_HEM.search(t)
         if not hem_m:
             return None
         hem = hem_m.group(1).lower()
 
-        deg_m = re.search(r"^\s*(\d+)", t)
-        min_m = re.search(r"^\s*\d+\D+(\d+)", t)
-        sec_m = re.search(r"\d+\D+\d+\D+(\d+[.,]?\d*)", t)  # segundos con coma o punto
+        deg_m = _RE_DEG.search(t)
+        min_m = _RE_MIN.search(t)
+        sec_m = _RE_SEC.search(t)
 
         if not (deg_m and min_m and sec_m):
             return None
@@ -78,30 +145,27 @@ def extraer_lat_lon_alt(html: str):
     lat_dec = lon_dec = alt_m = None
 
     # DMS en DOM
-    lat_txt_m = re.search(r'id="ContentPlaceHolder1_lblLatitud"[^>]*>([^<]+)</label>', html)
-    lon_txt_m = re.search(r'id="ContentPlaceHolder1_lblLongitud"[^>]*>([^<]+)</label>', html)
-    alt_txt_m = re.search(r'id="ContentPlaceHolder1_lblAltura"[^>]*>([^<]+)</label>', html)
+    labels = labels_coordenadas(html)
 
-    if lat_txt_m and lon_txt_m:
-        lat_dec = dms_to_decimal(lat_txt_m.group(1))
-        lon_dec = dms_to_decimal(lon_txt_m.group(1))
+    if "Latitud" in labels and "Longitud" in labels:
+        lat_dec = dms_to_decimal(labels["Latitud"])
+        lon_dec = dms_to_decimal(labels["Longitud"])
 
     # Fallback: variables JS en decimal
     if lat_dec is None or lon_dec is None:
-        lat_js = js_var(html, "EstacionLat", r"(-?\d+\.\d+)")
-        lon_js = js_var(html, "EstacionLon", r"(-?\d+\.\d+)")
-        try:
-            if lat_dec is None and lat_js:
-                lat_dec = float(lat_js)
-            if lon_dec is None and lon_js:
-                lon_dec = float(lon_js)
-        except ValueError:
-            pass
+        js = variables_js(html)
+        lat_js = js.get("EstacionLat")
+        lon_js = js.get("EstacionLon")
+        # variables_js ya validó el formato: cada una se convierte por separado
+        if lat_dec is None and lat_js:
+            lat_dec = float(lat_js)
+        if lon_dec is None and lon_js:
+            lon_dec = float(lon_js)
 
     # Altitud numérica (si está)
-    if alt_txt_m:
-        alt_txt = unescape(alt_txt_m.group(1)).strip()
-        mnum = re.search(r"(\d+[.,]?\d*)", alt_txt.replace(",", "."))
+    if "Altura" in labels:
+        alt_txt = unescape(labels["Altura"]).strip()
+        mnum = _RE_NUMERO.search(alt_txt.replace(",", "."))
         if mnum:
             try:
                 alt_m = float(mnum.group(1))
@@ -112,14 +176,15 @@ def extraer_lat_lon_alt(html: str):
 
 def extraer_nombre(html: str):
     """Nombre desde H1 o var JS."""
-    m = re.search(r'id="ContentPlaceHolder1_Titulo"[^>]*>\s*([^<]+)\s*</h1>', html)
+    m = _RE_TITULO.search(html)
     if m:
         t = unescape(m.group(1)).strip()
-        t = re.sub(r"^Datos de la estación:\s*", "", t, flags=re.I)
+        if t[:len(_PREFIJO_TITULO)].lower() == _PREFIJO_TITULO:
+            t = t[len(_PREFIJO_TITULO):].lstrip()
         t = t.replace(",", " ")
         if t:
             return t
-    nom_js = js_var(html, "EstacionNombre", r'(".*?")')
+    nom_js = variables_js(html).get("EstacionNombre")
     if nom_js:
         try:
             return json.loads(nom_js).replace(",", " ")
@@ -6,18 +6,22 @@ descarga_incremental.py
 Actualiza de forma incremental los CSV masivos existentes en la carpeta 'datos_masivos/'.
 
 Supuestos coherentes con 'descarga_masiva.py':
-- Un archivo por estación: {id}_{Nombre}.csv en UTF-8, delimitado por ';', decimales con coma.
+- Un archivo por estación: {id}_{Nombre}.csv.gz (o .csv plano) en UTF-8, delimitado por ';',
+  decimales con coma.
 - Primera columna (o al menos una columna) llamada "Fecha/Hora" (con comillas en el CSV original).
 - Cada mes se descarga desde el endpoint:
   https://clima.sanluis.gob.ar/ObtenerCsv.aspx?tipo=Periodo&Estacion={id}&fechaDesde=YYYYMMDD&fechahasta=YYYYMMDD
 
 Comportamiento:
 - Si 'datos_masivos/' no existe => error personalizado y termina.
-- Para cada archivo: obtiene la última fecha/hora y descarga lo faltante (mes a mes) hasta hoy.
+- Para cada archivo: obtiene la última fecha/hora y descarga lo faltante (mes a mes) hasta hoy;
+  el primer y el último mes se piden sólo desde el día de la última observación / hasta hoy.
 - Evita duplicados: descarta filas con Fecha/Hora <= última fecha consolidada.
 - Mantiene el encabezado original (no lo repite al anexar).
+- Guarda la última fecha/hora por archivo en 'datos_masivos/_state.json' para no
+  re-escanear los CSV en la próxima corrida (se ignora si el archivo cambió de tamaño).
 
-Requisitos: Python 3 estándar (sin dependencias externas).
+Requisitos: Python 3 estándar (sin dependencias externas); usa rem_http.py del mismo directorio.
 """
 
 import sys
@@ -25,12 +29,18 @@ import os
 import re
 import io
 import csv
-import time
-from glob import glob
+import gzip
+import json
+import zlib
+import threading
+import http.client
+from functools import lru_cache
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
+
+from rem_http import REDIRECCIONES, PoolConexiones, TokenBucket, es_html
 
 # =========================
 # Configuración
@@ -38,12 +48,28 @@ from urllib.error import HTTPError, URLError
 
 URL_CSV = "https://clima.sanluis.gob.ar/ObtenerCsv.aspx"
 DIR_MASIVOS = "datos_masivos"
+ARCHIVO_ESTADO = "_state.json"  # índice lateral dentro de DIR_MASIVOS
 
 REINTENTOS = 3
 BACKOFF_BASE = 0.8
 RATE_LIMIT_S = 0.25
+RAFAGA_MAX = 4
+HILOS_POR_ESTACION = 8
+ESTACIONES_PARALELAS = 4
+MAX_CONEXIONES = 4
+TIMEOUT_S = 45
+BUFFER_ESCRITURA = 1 << 20
+NIVEL_GZIP = 6
 UA = "Mozilla/5.0 (REM-incremental)"
 
+_RE_ID_PREFIX = re.compile(r"^(\d+)_")
+
+# Lo que lanza gzip al leer un miembro cortado a mitad de escritura (o lo que se anexó detrás)
+_ERRORES_GZ = (EOFError, gzip.BadGzipFile, zlib.error)
+
+# El estado se comparte entre hilos de estaciones
+_estado_lock = threading.Lock()
+
 # =========================
 # Excepciones personalizadas
 # =========================
@@ -60,6 +86,15 @@ class DescargaError(Exception):
         self.url = url
         self.status = status
 
+class ArchivoCorruptoError(Exception):
+    """Un .csv.gz que no se puede leer ni recuperar (p.ej. cortado antes de la cabecera)."""
+    pass
+
+class DescargaInterrumpidaError(Exception):
+    """Se pidió cortar la corrida (Ctrl-C): no se descargan más meses."""
+    def __init__(self):
+        super().__init__("Descarga interrumpida por el usuario")
+
 # =========================
 # Utilidades de fechas
 # =========================
@@ -86,54 +121,124 @@ def construir_url_csv(estacion_id: str, fd: str, fh: str) -> str:
     }
     return f"{URL_CSV}?{urlencode(params)}"
 
-def es_html(data: bytes) -> bool:
-    head = data[:256].lower()
-    return b"<!doctype html" in head or b"<html" in head
-
-def solicitar(url: str, intentos: int = REINTENTOS) -> bytes:
+# Conexiones y rate limit compartidos por todos los hilos (ver rem_http.py)
+POOL = PoolConexiones(MAX_CONEXIONES, UA)
+LIMITADOR = TokenBucket(rate=1.0 / RATE_LIMIT_S, capacity=RAFAGA_MAX)
+# Se activa con Ctrl-C: las estaciones en curso dejan de pedir meses
+DETENER = threading.Event()
+
+def headers_condicionales(validadores: Optional[dict]) -> dict:
+    """Arma If-Modified-Since / If-None-Match a partir de lo que devolvió el servidor la vez anterior."""
+    headers = {}
+    if validadores:
+        if validadores.get("Last-Modified"):
+            headers["If-Modified-Since"] = validadores["Last-Modified"]
+        if validadores.get("ETag"):
+            headers["If-None-Match"] = validadores["ETag"]
+    return headers
+
+def solicitar(url: str, intentos: int = REINTENTOS, validadores: Optional[dict] = None,
+              recortar_html: bool = False):
+    """
+    GET con reintentos. Si hay 'validadores' de una descarga previa de la misma URL
+    se hace un GET condicional. Retorna (data, validadores_nuevos); data es None
+    si el servidor respondió 304 Not Modified. Si el servidor no envía
+    Last-Modified/ETag, validadores_nuevos queda vacío y nunca se condiciona.
+    Con 'recortar_html' una página HTML se devuelve truncada (ver leer_cuerpo).
+    """
     backoff = BACKOFF_BASE
+    condicionales = headers_condicionales(validadores)
     for i in range(intentos):
+        LIMITADOR.adquirir(DETENER)
+        if DETENER.is_set():
+            raise DescargaInterrumpidaError()
         try:
-            req = Request(url, headers={"User-Agent": UA})
-            with urlopen(req, timeout=45) as resp:
-                status = getattr(resp, "status", 200)
-                data = resp.read()
-                if status != 200:
-                    raise DescargaError("?", url, status)
-                return data
-        except (HTTPError, URLError) as e:
+            status, resp_headers, data = POOL.get(url, TIMEOUT_S, headers=condicionales, recortar_html=recortar_html)
+            if status == 304:
+                return None, validadores
+            if status == 200:
+                nuevos = {k: resp_headers[k] for k in ("Last-Modified", "ETag") if resp_headers.get(k)}
+                return data, nuevos
+            if status in REDIRECCIONES:
+                # redirección no seguida (p.ej. a una página de error): como el HTML, se omite sin reintentar
+                return b"", {}
+            if i == intentos - 1:
+                raise DescargaError("?", url, status)
+        except (http.client.HTTPException, OSError) as e:
             if i == intentos - 1:
-                raise DescargaError("?", url, getattr(e, "code", "URLError"), str(e))
-            time.sleep(backoff)
-            backoff *= 1.8
+                raise DescargaError("?", url, type(e).__name__, str(e))
+        DETENER.wait(backoff)
+        backoff *= 1.8
     raise DescargaError("?", url, -1, "Fallo inesperado en reintentos")
 
-def descargar_mes_texto(estacion_id: str, y: int, m: int) -> str:
-    """Devuelve el CSV crudo como texto UTF-8 (decodificado desde cp1252). Si es HTML o vacío, retorna ''."""
+def descargar_mes_csv(estacion_id: str, y: int, m: int, cache: Optional[dict] = None,
+                      desde: Optional[date] = None, hasta: Optional[date] = None):
+    """
+    Descarga el CSV crudo del mes (bytes cp1252, sin decodificar), recortado
+    a [desde, hasta] si alguno de los dos cae dentro del mes.
+    'cache' es lo registrado para este mes en la corrida anterior
+    ({"url", "Last-Modified", "ETag"}); sólo se usa si la URL coincide.
+    Retorna (data, cache_nuevo): data es None si el mes no cambió (304),
+    b"" si es HTML o vacío.
+    """
     first, last = mes_rango(y, m)
+    if desde is not None:
+        first = max(first, desde)
+    if hasta is not None:
+        last = min(last, hasta)
     fd, fh = yyyymmdd(first), yyyymmdd(last)
     url = construir_url_csv(estacion_id, fd, fh)
-    data = solicitar(url)
+    validadores = cache if cache and cache.get("url") == url else None
+    data, validadores = solicitar(url, validadores=validadores, recortar_html=True)
+    cache_nuevo = {"url": url, **validadores} if validadores else None
+    if data is None:
+        return None, cache_nuevo
     if es_html(data):
         sys.stderr.write(f"[INFO] HTML recibido (omitido) | est={estacion_id} y={y} m={m:02d}\n")
-        return ""
-    text = data.decode("cp1252", errors="replace")
+        return b"", cache_nuevo
     # ¿al menos header + 1 dato?
-    if text.count("\n") < 1:
-        return ""
-    return text
+    if data.count(b"\n") < 1:
+        return b"", cache_nuevo
+    return data, cache_nuevo
+
+def intentar_descargar_mes_csv(estacion_id: str, y: int, m: int, cache: Optional[dict] = None,
+                               desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Como descargar_mes_csv, pero devuelve el error en vez de lanzarlo: (y, m, data, cache_nuevo, error)."""
+    try:
+        return (y, m, *descargar_mes_csv(estacion_id, y, m, cache, desde, hasta), None)
+    except DescargaError as e:
+        return y, m, b"", None, e
 
 # =========================
 # CSV / Parsing
 # =========================
 
+def lineas_cp1252(data: bytes):
+    """Itera las líneas (sin fin de línea) de un CSV cp1252, decodificando en streaming."""
+    with io.TextIOWrapper(io.BytesIO(data), encoding="cp1252", errors="replace") as f:
+        for linea in f:
+            yield linea.rstrip("\n")
+
+def abrir_csv(ruta_csv: str, modo: str = "r"):
+    """
+    Abre un CSV de estación en modo texto ('r' o 'a'), transparente a gzip:
+    los .csv.gz se anexan como un nuevo miembro gzip (válido para gzip/pandas).
+    """
+    if ruta_csv.endswith(".gz"):
+        if modo == "r":
+            return gzip.open(ruta_csv, "rt", encoding="utf-8", errors="replace")
+        return gzip.open(ruta_csv, modo + "t", encoding="utf-8", newline="", compresslevel=NIVEL_GZIP)
+    if modo == "r":
+        return io.open(ruta_csv, "r", encoding="utf-8", errors="replace")
+    return io.open(ruta_csv, modo, encoding="utf-8", newline="", buffering=BUFFER_ESCRITURA)
+
 def extraer_id_de_archivo(nombre_archivo: str) -> str:
     """
-    Espera nombres como '27_Merlo.csv' o '90_Dique_Algo.csv'.
+    Espera nombres como '27_Merlo.csv', '27_Merlo.csv.gz' o '90_Dique_Algo.csv'.
     Devuelve la parte numérica inicial como string (sin validar que exista en web).
     """
     base = os.path.basename(nombre_archivo)
-    m = re.match(r"^(\d+)_", base)
+    m = _RE_ID_PREFIX.match(base)
     return m.group(1) if m else ""
 
 def detectar_idx_fecha(header: str) -> int:
@@ -149,23 +254,76 @@ def detectar_idx_fecha(header: str) -> int:
     # fallback: primera columna
     return 0
 
+@lru_cache(maxsize=1024)
+def _parsear_fecha_cache(s: str) -> datetime:
+    # Formato fijo 'dd/mm/YYYY HH:MM:SS' (19 chars): se corta por posición,
+    # mucho más rápido que strptime. Cualquier otra variante va a strptime.
+    if (len(s) == 19 and s[2] == s[5] == "/" and s[10] == " " and s[13] == s[16] == ":"
+            and (s[0:2] + s[3:5] + s[6:10] + s[11:13] + s[14:16] + s[17:19]).isdigit()):
+        try:
+            return datetime(int(s[6:10]), int(s[3:5]), int(s[0:2]),
+                            int(s[11:13]), int(s[14:16]), int(s[17:19]))
+        except ValueError:
+            pass
+    return datetime.strptime(s, "%d/%m/%Y %H:%M:%S")
+
 def parsear_fecha_hora(cadena: str) -> datetime:
     """
     Convierte 'dd/mm/YYYY HH:MM:SS' a datetime. Tolerante a comillas/espacios.
     """
     s = cadena.strip().strip('"').strip("'")
-    return datetime.strptime(s, "%d/%m/%Y %H:%M:%S")
+    return _parsear_fecha_cache(s)
+
+def fecha_de_fila(fila: str, idx_fecha: int) -> Optional[datetime]:
+    """Fecha/Hora de una fila CSV, o None si no tiene esa columna o no se puede parsear."""
+    # sólo hace falta cortar hasta la columna de fecha
+    partes = fila.split(";", idx_fecha + 1)
+    if idx_fecha >= len(partes):
+        return None
+    try:
+        return parsear_fecha_hora(partes[idx_fecha])
+    except ValueError:
+        return None
 
-def obtener_ultima_fecha_existente(ruta_csv: str) -> tuple[datetime, str]:
+def leer_ultima_linea(ruta_csv: str, bufsize: int = 8192) -> str:
+    """
+    Devuelve la última línea no vacía del archivo leyendo bloques desde el final,
+    sin recorrer el resto del archivo. Los .gz no admiten lectura hacia atrás:
+    se descomprimen en streaming quedándose con la última línea.
+    """
+    if ruta_csv.endswith(".gz"):
+        ultima = ""
+        with abrir_csv(ruta_csv) as f:
+            for linea in f:
+                if linea.strip():
+                    ultima = linea
+        return ultima.rstrip("\r\n")
+
+    with io.open(ruta_csv, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0:
+            leer = min(bufsize, pos)
+            pos -= leer
+            f.seek(pos)
+            buf = f.read(leer) + buf
+            # la última línea está completa cuando tenemos el salto que la precede
+            if b"\n" in buf.rstrip():
+                break
+    ultima = buf.rstrip().rsplit(b"\n", 1)[-1]
+    return ultima.decode("utf-8", errors="replace").rstrip("\r")
+
+def escanear_ultima_fecha(ruta_csv: str) -> tuple[datetime, str]:
     """
-    Escanea el archivo para encontrar la última Fecha/Hora válida.
+    Escanea el archivo completo para encontrar la última Fecha/Hora válida.
     Retorna (dt_ultima, header_line). Si no hay datos, dt_ultima=None.
     """
     ultima_dt = None
     header = None
     idx_fecha = None
 
-    with io.open(ruta_csv, "r", encoding="utf-8", errors="replace") as f:
+    with abrir_csv(ruta_csv) as f:
         for n, line in enumerate(f):
             line = line.rstrip("\n")
             if n == 0:
@@ -186,6 +344,76 @@ def obtener_ultima_fecha_existente(ruta_csv: str) -> tuple[datetime, str]:
                 continue
     return ultima_dt, header or ""
 
+def leer_header(ruta_csv: str) -> str:
+    """Devuelve la primera línea del archivo (sin fin de línea)."""
+    with abrir_csv(ruta_csv) as f:
+        return f.readline().rstrip("\r\n")
+
+def obtener_ultima_fecha_existente(ruta_csv: str) -> tuple[datetime, str]:
+    """
+    Obtiene la última Fecha/Hora del archivo. Como los CSV se escriben en orden
+    cronológico, basta con leer la última línea; si no se puede parsear, cae al
+    escaneo completo.
+    Retorna (dt_ultima, header_line). Si no hay datos, dt_ultima=None.
+    """
+    header = leer_header(ruta_csv)
+    idx_fecha = detectar_idx_fecha(header)
+
+    partes = leer_ultima_linea(ruta_csv).split(";")
+    if idx_fecha < len(partes):
+        try:
+            return parsear_fecha_hora(partes[idx_fecha]), header
+        except ValueError:
+            pass
+    return escanear_ultima_fecha(ruta_csv)
+
+def recuperar_gz(ruta_csv: str) -> int:
+    """
+    Reescribe un .csv.gz cortado a mitad de escritura (corrida interrumpida) con
+    su parte legible: la cabecera y las filas con Fecha/Hora válida y no
+    decreciente hasta el primer error. Pasado el corte gzip puede seguir
+    entregando basura (sobre todo si después se anexaron más miembros), por eso
+    se valida cada fila. Lo descartado se vuelve a descargar, porque la última
+    fecha pasa a ser la de la parte conservada.
+    Retorna las filas conservadas; si no queda ni la cabecera lanza ArchivoCorruptoError.
+    """
+    ruta_tmp = ruta_csv + ".tmp"
+    header = None
+    filas = 0
+    try:
+        with gzip.open(ruta_csv, "rb") as src, \
+                gzip.open(ruta_tmp, "wb", compresslevel=NIVEL_GZIP) as dst:
+            anterior = None
+            try:
+                for crudo in src:
+                    try:
+                        linea = crudo.decode("utf-8")
+                    except UnicodeDecodeError:
+                        break
+                    if not linea.endswith("\n"):
+                        break
+                    if header is None:
+                        header = linea
+                        idx_fecha = detectar_idx_fecha(header)
+                    else:
+                        dt = fecha_de_fila(linea.rstrip("\r\n"), idx_fecha)
+                        if dt is None or (anterior is not None and dt < anterior):
+                            break
+                        anterior = dt
+                        filas += 1
+                    dst.write(crudo)
+            except _ERRORES_GZ:
+                pass
+        if header is None:
+            raise ArchivoCorruptoError(
+                f"{ruta_csv}: gzip ilegible desde el inicio; volvé a generarlo con descarga_masiva.py"
+            )
+        os.replace(ruta_tmp, ruta_csv)
+    finally:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+    return filas
+
 def generar_meses_desde_hasta(desde: date, hasta: date):
     """Genera (año, mes) desde el mes de 'desde' hasta el mes de 'hasta' (inclusive)."""
     y, m = desde.year, desde.month
@@ -193,16 +421,83 @@ def generar_meses_desde_hasta(desde: date, hasta: date):
         yield (y, m)
         y, m = (y + 1, 1) if m == 12 else (y, m + 1)
 
+# =========================
+# Estado incremental (índice lateral)
+# =========================
+
+def ruta_estado() -> str:
+    return os.path.join(DIR_MASIVOS, ARCHIVO_ESTADO)
+
+def cargar_estado() -> dict[str, dict]:
+    """
+    Lee '_state.json': {nombre_archivo: {"ultima": datetime, "bytes": int, "http": {...}}}.
+    Se indexa por nombre de archivo y no por id: si quedaron dos archivos de la
+    misma estación (p.ej. tras un cambio de nombre), cada uno tiene su entrada.
+    "bytes" es el tamaño del CSV cuando se registró la fecha; si el archivo
+    cambió por fuera (p.ej. se volvió a correr descarga_masiva.py), la entrada
+    se ignora. "http" guarda, por mes "YYYY-MM", la URL pedida y los validadores
+    (Last-Modified/ETag) que devolvió el servidor, para el GET condicional.
+    Si el archivo falta o está corrupto, devuelve {}.
+    """
+    try:
+        with io.open(ruta_estado(), "r", encoding="utf-8") as f:
+            crudo = json.load(f)
+        return {
+            nombre: {
+                "ultima": datetime.fromisoformat(e["ultima"]),
+                "bytes": int(e["bytes"]),
+                "http": dict(e.get("http", {})),
+            }
+            for nombre, e in crudo.items()
+        }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+def guardar_estado(estado: dict[str, dict]) -> None:
+    """Escribe '_state.json' de forma atómica (archivo temporal + os.replace)."""
+    crudo = {
+        nombre: {"ultima": e["ultima"].isoformat(), "bytes": e["bytes"], "http": e["http"]}
+        for nombre, e in sorted(estado.items())
+    }
+    tmp = ruta_estado() + ".tmp"
+    with io.open(tmp, "w", encoding="utf-8") as f:
+        json.dump(crudo, f, indent=1)
+    os.replace(tmp, ruta_estado())
+
+def registrar_estado(estado: dict[str, dict], ruta_csv: str, ultima_dt: datetime, http_cache: dict) -> None:
+    """Actualiza la entrada de un archivo de estación y persiste el índice."""
+    with _estado_lock:
+        estado[os.path.basename(ruta_csv)] = {"ultima": ultima_dt, "bytes": os.path.getsize(ruta_csv), "http": http_cache}
+        guardar_estado(estado)
+
+def entrada_vigente(estado: dict[str, dict], ruta_csv: str) -> Optional[dict]:
+    """Entrada del índice si sigue vigente para el archivo actual; None si no hay o quedó desactualizada."""
+    entrada = estado.get(os.path.basename(ruta_csv))
+    if entrada and entrada["bytes"] == os.path.getsize(ruta_csv):
+        return entrada
+    return None
+
+def esta_al_dia(estado: dict[str, dict], entrada: os.DirEntry, hoy: date) -> bool:
+    """
+    True si el índice ya tiene una observación de hoy para este archivo (y el
+    archivo no cambió de tamaño): actualizar_archivo_estacion no haría nada.
+    Usa el stat cacheado de os.scandir.
+    """
+    registro = estado.get(entrada.name)
+    return (registro is not None
+            and registro["bytes"] == entrada.stat().st_size
+            and registro["ultima"].date() >= hoy)
+
 # =========================
 # Lógica principal
 # =========================
 
-def actualizar_archivo_estacion(ruta_csv: str) -> int:
+def actualizar_archivo_estacion(ruta_csv: str, estado: Optional[dict[str, dict]] = None) -> int:
     """
     Actualiza (si corresponde) un archivo de estación existente.
-    - Detecta última fecha.
+    - Detecta última fecha (del índice 'estado' si está vigente; si no, del CSV).
     - Descarga meses necesarios.
-    - Anexa sin duplicar.
+    - Anexa sin duplicar y registra la nueva última fecha en 'estado'.
     Devuelve la cantidad de filas nuevas añadidas.
     """
     estacion_id = extraer_id_de_archivo(ruta_csv)
@@ -210,43 +505,79 @@ def actualizar_archivo_estacion(ruta_csv: str) -> int:
         sys.stderr.write(f"[WARN] No se pudo inferir id de estación desde nombre: {ruta_csv}\n")
         return 0
 
-    ultima_dt, header_existente = obtener_ultima_fecha_existente(ruta_csv)
+    if estado is None:
+        estado = {}
+    entrada = entrada_vigente(estado, ruta_csv)
+    try:
+        if entrada is not None:
+            ultima_dt = entrada["ultima"]
+            http_previo = entrada["http"]
+            header_existente = leer_header(ruta_csv)
+        else:
+            ultima_dt, header_existente = obtener_ultima_fecha_existente(ruta_csv)
+            http_previo = {}
+    except _ERRORES_GZ as e:
+        conservadas = recuperar_gz(ruta_csv)
+        sys.stderr.write(
+            f"[WARN] gzip cortado o corrupto ({e}): {ruta_csv}. Se conservan sus "
+            f"primeras {conservadas} filas y se vuelve a descargar lo que sigue.\n"
+        )
+        ultima_dt, header_existente = obtener_ultima_fecha_existente(ruta_csv)
+        http_previo = {}
+
+    hoy = date.today()
     if ultima_dt is None:
         sys.stderr.write(f"[INFO] Archivo sin datos (o sólo cabecera), se intentará reconstruir desde su creación): {ruta_csv}\n")
         # Si no hay fecha, empezamos desde hace 60 días (conservador) para rellenar algo razonable:
-        desde = date.today() - timedelta(days=60)
-    else:
-        # día siguiente a la última observación:
-        desde = (ultima_dt + timedelta(days=1)).date()
-
-    hoy = date.today()
-    if desde > hoy:
-        # Nada para hacer
+        desde = hoy - timedelta(days=60)
+    elif ultima_dt.date() >= hoy:
+        # Ya hay datos de hoy: nada para hacer (pero dejamos el índice al día para no re-escanear)
+        registrar_estado(estado, ruta_csv, ultima_dt, http_previo)
         return 0
+    else:
+        # desde el día de la última observación (lo ya consolidado lo descarta el filtro)
+        desde = ultima_dt.date()
 
-    # Vamos a anexar: abrimos en modo append
-    filas_nuevas = 0
+    # Filas a anexar de todos los meses; el archivo se abre sólo si hay alguna
+    # (un .gz suma cabecera y cola de miembro aunque no se escriba nada)
+    filas_nuevas = []
+    nueva_ultima_dt = ultima_dt
     idx_fecha_existente = detectar_idx_fecha(header_existente)
 
-    with io.open(ruta_csv, "a", encoding="utf-8", newline="") as out:
-        for y, m in generar_meses_desde_hasta(desde, hoy):
-            try:
-                texto = descargar_mes_texto(estacion_id, y, m)
-            except DescargaError as e:
-                sys.stderr.write(f"[WARN] {e}\n")
-                time.sleep(RATE_LIMIT_S)
+    # Las filas llegan en orden cronológico: una vez que aparece una posterior a
+    # ultima_dt, todo lo que sigue es nuevo y no hace falta parsear cada fecha.
+    pasado_corte = ultima_dt is None
+
+    meses = list(generar_meses_desde_hasta(desde, hoy))
+    # sólo se conservan los validadores de los meses pedidos en esta corrida
+    http_nuevo = {}
+
+    def bajar(ym):
+        if DETENER.is_set():
+            raise DescargaInterrumpidaError()
+        y, m = ym
+        return intentar_descargar_mes_csv(estacion_id, y, m, http_previo.get(f"{y}-{m:02d}"), desde, hoy)
+
+    # Descarga paralela de meses; map() preserva el orden para anexar cronológicamente
+    with ThreadPoolExecutor(max_workers=HILOS_POR_ESTACION) as pool:
+        resultados = pool.map(bajar, meses)
+        for y, m, data, cache_mes, error in resultados:
+            if error is not None:
+                sys.stderr.write(f"[WARN] {error}\n")
                 continue
 
-            if not texto:
-                time.sleep(RATE_LIMIT_S)
+            if cache_mes:
+                http_nuevo[f"{y}-{m:02d}"] = cache_mes
+
+            # None => 304 Not Modified: ya tenemos todo lo de este mes
+            if not data:
                 continue
 
-            lineas = texto.splitlines()
-            if not lineas:
-                time.sleep(RATE_LIMIT_S)
+            lineas = lineas_cp1252(data)
+            header_nuevo = next(lineas, None)
+            if header_nuevo is None:
                 continue
 
-            header_nuevo = lineas[0].replace("\r", "")
             # No reescribimos header (ya existe). Si difiere, sólo avisamos.
             if header_existente and header_nuevo != header_existente:
                 sys.stderr.write(
@@ -255,25 +586,42 @@ def actualizar_archivo_estacion(ruta_csv: str) -> int:
                 )
 
             # Anexar sólo filas nuevas (Fecha/Hora > ultima_dt)
-            for fila in lineas[1:]:
+            filas_mes = []
+            for fila in lineas:
                 if not fila.strip():
                     continue
-                partes = fila.split(";")
-                # seguridad: si el índice no existe, anexo igual (mejor no perder datos)
-                if idx_fecha_existente < len(partes):
-                    try:
-                        dt = parsear_fecha_hora(partes[idx_fecha_existente])
-                        if (ultima_dt is not None) and (dt <= ultima_dt):
+                if not pasado_corte:
+                    # si no pude parsear fecha, anexo por no perder registros
+                    dt = fecha_de_fila(fila, idx_fecha_existente)
+                    if dt is not None:
+                        if dt <= ultima_dt:
                             continue  # duplicado o más viejo
-                    except Exception:
-                        # si no pude parsear fecha, anexo por no perder registros
-                        pass
-                out.write(fila.rstrip("\r") + "\n")
-                filas_nuevas += 1
-
-            time.sleep(RATE_LIMIT_S)
-
-    return filas_nuevas
+                        pasado_corte = True
+                filas_mes.append(fila + "\n")
+            filas_nuevas.extend(filas_mes)
+
+            # la fecha más nueva del mes es la de su última fila parseable
+            for fila in reversed(filas_mes):
+                dt = fecha_de_fila(fila, idx_fecha_existente)
+                if dt is not None:
+                    if (nueva_ultima_dt is None) or (dt > nueva_ultima_dt):
+                        nueva_ultima_dt = dt
+                    break
+
+    if filas_nuevas:
+        with abrir_csv(ruta_csv, "a") as out:
+            out.writelines(filas_nuevas)
+
+    if nueva_ultima_dt is not None:
+        registrar_estado(estado, ruta_csv, nueva_ultima_dt, http_nuevo)
+    return len(filas_nuevas)
+
+def intentar_actualizar_archivo(ruta_csv: str, estado: dict[str, dict]):
+    """Corre actualizar_archivo_estacion en un hilo, devolviendo (ruta, filas_nuevas, error)."""
+    try:
+        return ruta_csv, actualizar_archivo_estacion(ruta_csv, estado), None
+    except Exception as e:
+        return ruta_csv, 0, e
 
 def main():
     # 1) Validación de carpeta
@@ -283,36 +631,55 @@ def main():
             "Primero generá los datos con descarga_masiva.py"
         )
 
-    # 2) Buscar archivos {id}_{Nombre}.csv
-    patrones = os.path.join(DIR_MASIVOS, "*.csv")
-    archivos = sorted(glob(patrones))
-    if not archivos:
+    # 2) Buscar archivos {id}_{Nombre}.csv / {id}_{Nombre}.csv.gz
+    with os.scandir(DIR_MASIVOS) as it:
+        entradas = [
+            e for e in it
+            if e.is_file(follow_symlinks=False) and e.name.endswith((".csv", ".csv.gz"))
+        ]
+    entradas.sort(key=lambda e: e.name)
+    if not entradas:
         raise DatosMasivosNoExistenError(
             f"No se hallaron CSVs en '{DIR_MASIVOS}'. "
-            "Asegurate de haber corrido descarga_masiva.py y de que el patrón sea {id}_{Nombre}.csv"
+            "Asegurate de haber corrido descarga_masiva.py y de que el patrón sea {id}_{Nombre}.csv[.gz]"
         )
 
-    print(f"== Incremental REM == Archivos a revisar: {len(archivos)}")
+    print(f"== Incremental REM == Archivos a revisar: {len(entradas)}")
     total_nuevas = 0
     con_cambios = 0
 
-    for i, ruta in enumerate(archivos, 1):
-        print(f"[{i}/{len(archivos)}] {os.path.basename(ruta)} ...", end="", flush=True)
+    # las entradas de archivos que ya no están (renombrados/borrados) se descartan
+    nombres = {e.name for e in entradas}
+    estado = {nombre: e for nombre, e in cargar_estado().items() if nombre in nombres}
+    hoy = date.today()
+    archivos = [e.path for e in entradas if not esta_al_dia(estado, e, hoy)]
+    if len(archivos) < len(entradas):
+        print(f"Al día según {ARCHIVO_ESTADO} (se omiten): {len(entradas) - len(archivos)}")
+
+    with ThreadPoolExecutor(max_workers=ESTACIONES_PARALELAS) as pool:
+        futuros = [pool.submit(intentar_actualizar_archivo, ruta, estado) for ruta in archivos]
         try:
-            n = actualizar_archivo_estacion(ruta)
-            if n > 0:
-                con_cambios += 1
-                total_nuevas += n
-                print(f" +{n} filas nuevas")
-            else:
-                print(" sin cambios")
-        except DescargaError as e:
-            print(f" ERROR descarga: {e}", file=sys.stderr)
-        except Exception as e:
-            print(f" ERROR: {e}", file=sys.stderr)
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                ruta, n, error = futuro.result()
+                print(f"[{i}/{len(archivos)}] {os.path.basename(ruta)} ...", end="", flush=True)
+                if isinstance(error, DescargaError):
+                    print(f" ERROR descarga: {error}", file=sys.stderr)
+                elif error is not None:
+                    print(f" ERROR: {error}", file=sys.stderr)
+                elif n > 0:
+                    con_cambios += 1
+                    total_nuevas += n
+                    print(f" +{n} filas nuevas")
+                else:
+                    print(" sin cambios")
+        except KeyboardInterrupt:
+            # no arrancar archivos pendientes; los que están en curso cortan en el próximo mes
+            DETENER.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
     print("\n== Resumen incremental ==")
-    print(f"Archivos revisados:     {len(archivos)}")
+    print(f"Archivos revisados:     {len(entradas)}")
     print(f"Archivos actualizados:  {con_cambios}")
     print(f"Filas nuevas totales:   {total_nuevas}")
 
@@ -10,11 +10,13 @@ Características:
 - Descubre estaciones desde la página InformePorPeriodo.aspx
 - Endpoint CSV: ObtenerCsv.aspx?tipo=Periodo&Estacion={id}&fechaDesde=YYYYMMDD&fechahasta=YYYYMMDD
 - Paginado mensual (2007 -> hoy) con reintentos y rate limit suave
+- Estaciones y meses descargados en paralelo (pools de hilos) con rate limit global compartido
 - Salta HTML/errores y períodos vacíos
-- Convierte a UTF-8 y escribe un único archivo por estación: {id}_{Nombre}.csv
+- Convierte a UTF-8 y escribe un único archivo por estación: {id}_{Nombre}.csv.gz
+  (gzip; con COMPRIMIR = False, {id}_{Nombre}.csv plano)
 - Manejo de encabezados: escribe 1 sola cabecera; si cambia, avisa por stderr y continúa
 
-Requisitos: Python 3 estándar (sin dependencias externas)
+Requisitos: Python 3 estándar (sin dependencias externas); usa rem_http.py del mismo directorio
 """
 
 import sys
@@ -22,11 +24,15 @@ import os
 import re
 import io
 import csv
-import time
+import gzip
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
+from html.parser import HTMLParser
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
+
+from rem_http import REDIRECCIONES, PoolConexiones, TokenBucket, es_html
 
 # =========================
 # Configuración general
@@ -39,7 +45,15 @@ SALIDA_DIR = "datos_masivos"
 ANIO_INICIO = 2007           # Histórico aproximado de inicio de la REM
 REINTENTOS = 3               # Reintentos por request
 BACKOFF_BASE = 0.8           # Backoff exponencial base (segundos)
-RATE_LIMIT_S = 0.25          # Pausa entre requests (evitar ser agresivos)
+RATE_LIMIT_S = 0.25          # Intervalo medio entre requests, global (evitar ser agresivos)
+RAFAGA_MAX = 4               # Requests permitidos en ráfaga antes de aplicar el rate limit
+HILOS_POR_ESTACION = 8       # Meses descargados en paralelo por estación
+ESTACIONES_PARALELAS = 4     # Estaciones procesadas en simultáneo
+MAX_CONEXIONES = 4           # Conexiones HTTPS simultáneas al servidor, entre todos los hilos
+TIMEOUT_S = 45               # Timeout de socket por request (segundos)
+BUFFER_ESCRITURA = 1 << 20   # Buffer del archivo de salida (bytes)
+COMPRIMIR = True             # Guardar cada estación como .csv.gz en lugar de .csv plano
+NIVEL_GZIP = 6               # Compresión gzip (1 = rápido ... 9 = máximo)
 
 # Por defecto, incluimos solo tipos con datos útiles en este endpoint
 TAGS_PERMITIDOS = {"REM", "SLA"}
@@ -47,6 +61,10 @@ TAGS_EXCLUIR = {"PRONO", "TEST", "TEST1", "REM1", "SLA1"}  # variantes de prueba
 
 UA = "Mozilla/5.0 (REM-mass-downloader)"  # User-Agent inocuo
 
+# Regex precompiladas
+_RE_TAG_FINAL = re.compile(r"\(([^()]*)\)\s*$")
+_RE_SUFIJO_TAG = re.compile(r"\s*\([^()]*\)\s*$")
+
 
 # =========================
 # Excepciones personalizadas
@@ -64,6 +82,11 @@ class DescargaError(RemError):
         self.url = url
         self.status = status
 
+class DescargaInterrumpidaError(RemError):
+    """Se pidió cortar la corrida (Ctrl-C): no se descargan más meses."""
+    def __init__(self):
+        super().__init__("Descarga interrumpida por el usuario")
+
 class EstacionSinDatosError(RemError):
     """La estación no devolvió ningún dato útil en todo el rango."""
     def __init__(self, estacion_id, nombre):
@@ -76,15 +99,55 @@ class EstacionSinDatosError(RemError):
 # Utilidades
 # =========================
 
+class _TablaNombreArchivo(dict):
+    """
+    Tabla para str.translate: conserva caracteres de palabra (como \\w: letras,
+    dígitos, '_', incluidas tildes y ñ) más '-' y '.'; borra el resto.
+    Se completa a demanda, un code point por vez.
+    """
+    def __missing__(self, cp: int):
+        c = chr(cp)
+        valor = cp if (c.isalnum() or c in "_-.") else None
+        self[cp] = valor
+        return valor
+
+_TABLA_NOMBRE_ARCHIVO = _TablaNombreArchivo()
+
 def sanitizar_nombre_archivo(texto: str) -> str:
     """Convierte el nombre de estación a algo seguro para usar en un archivo."""
-    # Reemplazar espacios por _
-    out = re.sub(r"\s+", "_", texto.strip())
+    # Reemplazar espacios (cualquier racha) por _
+    out = "_".join(texto.split())
     # Quitar caracteres problemáticos
-    out = re.sub(r"[^\w\-_.áéíóúÁÉÍÓÚñÑ]", "", out)
+    out = out.translate(_TABLA_NOMBRE_ARCHIVO)
     # Evitar nombres excesivos
     return out[:100]
 
+def abrir_salida(ruta: str, comprimir: bool):
+    """Abre el CSV de salida para escritura: gzip si 'comprimir', texto plano si no."""
+    if comprimir:
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="", compresslevel=NIVEL_GZIP)
+    return io.open(ruta, "w", encoding="utf-8", newline="", buffering=BUFFER_ESCRITURA)
+
+def borrar_si_existe(ruta: str) -> None:
+    """Borra 'ruta' si existe; los errores de borrado se ignoran (no son fatales)."""
+    try:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    except OSError:
+        pass
+
+def borrar_otros_de_estacion(base_dir: str, est_id: str, conservar: str) -> None:
+    """Borra los {est_id}_*.csv / {est_id}_*.csv.gz de 'base_dir' salvo el archivo 'conservar'."""
+    prefijo = f"{est_id}_"
+    with os.scandir(base_dir) as it:
+        viejos = [
+            e.path for e in it
+            if e.name.startswith(prefijo) and e.name.endswith((".csv", ".csv.gz"))
+            and e.name != conservar and e.is_file(follow_symlinks=False)
+        ]
+    for ruta in viejos:
+        borrar_si_existe(ruta)
+
 def mes_rango(y: int, m: int):
     """Devuelve primer y último día (date) de un mes."""
     first = date(y, m, 1)
@@ -97,41 +160,59 @@ def mes_rango(y: int, m: int):
 def yyyymmdd(d: date) -> str:
     return d.strftime("%Y%m%d")
 
-def es_html(data: bytes) -> bool:
-    """Heurística simple para detectar HTML en lugar de CSV."""
-    head = data[:256].lower()
-    return b"<!doctype html" in head or b"<html" in head
+def generar_meses(desde: date, hasta: date):
+    """Genera (año, mes) desde el mes de 'desde' hasta el mes de 'hasta' (inclusive)."""
+    y, m = desde.year, desde.month
+    while (y < hasta.year) or (y == hasta.year and m <= hasta.month):
+        yield (y, m)
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
 
-def decodificar_cp1252(b: bytes) -> str:
-    """Convierte bytes cp1252 a str UTF-8 (python maneja internamente UTF-8)."""
-    return b.decode("cp1252", errors="replace")
+def lineas_cp1252(b: bytes):
+    """
+    Itera las líneas (sin fin de línea) de un CSV en cp1252, decodificando en
+    streaming en lugar de materializar el texto completo y su splitlines().
+    """
+    with io.TextIOWrapper(io.BytesIO(b), encoding="cp1252", errors="replace") as f:
+        for linea in f:
+            yield linea.rstrip("\n")
 
-def tiene_datos(csv_text: str) -> bool:
+def tiene_datos(data: bytes) -> bool:
     """Retorna True si el CSV parece tener algo más que la cabecera."""
-    # Contar líneas. Si <=1, sólo header o vacío
-    if not csv_text:
-        return False
-    lineas = csv_text.splitlines()
-    return len(lineas) > 1
-
-def solicitar(url: str, intentos: int = REINTENTOS) -> bytes:
-    """GET simple con reintentos y backoff exponencial."""
+    # Sin salto de línea interno => sólo header o vacío
+    return b"\n" in data.strip()
+
+# Conexiones y rate limit compartidos por todos los hilos (ver rem_http.py)
+POOL = PoolConexiones(MAX_CONEXIONES, UA)
+LIMITADOR = TokenBucket(rate=1.0 / RATE_LIMIT_S, capacity=RAFAGA_MAX)
+# Se activa con Ctrl-C: las estaciones en curso dejan de pedir meses
+DETENER = threading.Event()
+
+def solicitar(url: str, intentos: int = REINTENTOS, recortar_html: bool = False) -> bytes:
+    """
+    GET simple con reintentos y backoff exponencial. Con 'recortar_html' (para
+    endpoints que deberían devolver CSV) una página HTML se devuelve truncada.
+    """
     backoff = BACKOFF_BASE
     for i in range(intentos):
+        LIMITADOR.adquirir(DETENER)
+        if DETENER.is_set():
+            raise DescargaInterrumpidaError()
         try:
-            req = Request(url, headers={"User-Agent": UA})
-            with urlopen(req, timeout=45) as resp:
-                status = getattr(resp, "status", 200)
-                data = resp.read()
-                if status != 200:
-                    raise DescargaError("?", url, status)
+            status, _, data = POOL.get(url, TIMEOUT_S, recortar_html=recortar_html)
+            if status == 200:
                 return data
-        except (HTTPError, URLError) as e:
+            if status in REDIRECCIONES:
+                # redirección no seguida (p.ej. a una página de error): como el HTML, se omite sin reintentar
+                return b""
+            if i == intentos - 1:
+                # último intento: propagar error
+                raise DescargaError("?", url, status)
+        except (http.client.HTTPException, OSError) as e:
             if i == intentos - 1:
                 # último intento: propagar error
-                raise DescargaError("?", url, getattr(e, "code", "URLError"), str(e))
-            time.sleep(backoff)
-            backoff *= 1.8
+                raise DescargaError("?", url, type(e).__name__, str(e))
+        DETENER.wait(backoff)
+        backoff *= 1.8
     # teóricamente no llega acá
     raise DescargaError("?", url, -1, "Fallo inesperado en reintentos")
 
@@ -140,6 +221,42 @@ def solicitar(url: str, intentos: int = REINTENTOS) -> bytes:
 # Descubrimiento de estaciones
 # =========================
 
+class OpcionesEstacionParser(HTMLParser):
+    """
+    Junta los <option value='NNN'>TEXTO</option> del HTML en self.opciones,
+    como lista de (id, texto). Tolera <option> sin cierre explícito.
+    """
+
+    def __init__(self):
+        super().__init__()  # convert_charrefs: el texto llega con las entidades ya resueltas
+        self.opciones = []
+        self._actual = None  # (id, [fragmentos de texto]) del <option> abierto
+
+    def _cerrar_opcion(self):
+        if self._actual is not None:
+            est_id, textos = self._actual
+            self.opciones.append((est_id, "".join(textos)))
+            self._actual = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "option":
+            self._cerrar_opcion()
+            valor = (dict(attrs).get("value") or "").strip()
+            if valor.isdigit():
+                self._actual = (valor, [])
+
+    def handle_endtag(self, tag):
+        if tag in ("option", "optgroup", "select"):
+            self._cerrar_opcion()
+
+    def handle_data(self, data):
+        if self._actual is not None:
+            self._actual[1].append(data)
+
+    def close(self):
+        super().close()
+        self._cerrar_opcion()
+
 def obtener_estaciones():
     """
     Lee la página InformePorPeriodo.aspx y devuelve una lista de dicts:
@@ -149,19 +266,19 @@ def obtener_estaciones():
     text = html.decode("utf-8", errors="ignore")
 
     # Extraer todos los <option value='NNN'>TEXTO</option>
-    pattern = re.compile(
-        r"<option[^>]*value\s*=\s*['\"]?(\d+)['\"]?[^>]*>\s*([^<]+)",
-        re.IGNORECASE | re.DOTALL
-    )
+    parser = OpcionesEstacionParser()
+    parser.feed(text)
+    parser.close()
+
     estaciones = []
-    for est_id, nombre_crudo in pattern.findall(text):
+    for est_id, nombre_crudo in parser.opciones:
         # Normalizar espacios
-        nombre_crudo = re.sub(r"\s+", " ", nombre_crudo).strip()
+        nombre_crudo = " ".join(nombre_crudo.split())
         tag = ""
-        m = re.search(r"\(([^()]*)\)\s*$", nombre_crudo)
+        m = _RE_TAG_FINAL.search(nombre_crudo)
         if m:
             tag = m.group(1).strip()
-            nombre = re.sub(r"\s*\([^()]*\)\s*$", "", nombre_crudo).strip()
+            nombre = _RE_SUFIJO_TAG.sub("", nombre_crudo).strip()
         else:
             nombre = nombre_crudo
 
@@ -196,30 +313,41 @@ def construir_url_csv(estacion_id: str, fd: str, fh: str) -> str:
     }
     return f"{URL_CSV}?{urlencode(params)}"
 
-def descargar_mes(estacion_id: str, y: int, m: int) -> str:
+def descargar_mes(estacion_id: str, y: int, m: int) -> bytes:
     """
-    Descarga un mes para una estación y retorna el CSV como texto UTF-8.
-    Si el contenido es HTML o está vacío, retorna cadena vacía.
+    Descarga un mes para una estación y retorna el CSV crudo (bytes cp1252).
+    Si el contenido es HTML o está vacío, retorna b"".
     """
     first, last = mes_rango(y, m)
     fd, fh = yyyymmdd(first), yyyymmdd(last)
     url = construir_url_csv(estacion_id, fd, fh)
 
     # Reintentos con backoff ya dentro de 'solicitar'
-    data = solicitar(url)
+    data = solicitar(url, recortar_html=True)
 
     if es_html(data):
         # HTML devuelto (p.ej. PRONO o errores)
         sys.stderr.write(f"[INFO] HTML recibido (omitido) | est={estacion_id} y={y} m={m}\n")
-        return ""
-
-    text = decodificar_cp1252(data)
+        return b""
 
     # Verificar si hay datos reales (más que header)
-    if not tiene_datos(text):
-        return ""
+    if not tiene_datos(data):
+        return b""
 
-    return text
+    return data
+
+def intentar_descargar_mes(estacion_id: str, y: int, m: int):
+    """
+    Variante de descargar_mes apta para correr en un pool de hilos: no lanza
+    DescargaError, lo devuelve. Retorna (y, m, csv_data, error).
+    Si ya se pidió cortar (DETENER), lanza DescargaInterrumpidaError sin descargar.
+    """
+    if DETENER.is_set():
+        raise DescargaInterrumpidaError()
+    try:
+        return y, m, descargar_mes(estacion_id, y, m), None
+    except DescargaError as e:
+        return y, m, b"", e
 
 def guardar_estacion_csv(est: dict, base_dir: str) -> int:
     """
@@ -231,70 +359,80 @@ def guardar_estacion_csv(est: dict, base_dir: str) -> int:
     tag = est["tag"]
 
     nombre_archivo = f"{est_id}_{sanitizar_nombre_archivo(nombre)}.csv"
-    ruta = os.path.join(base_dir, nombre_archivo)
+    ruta_plana = os.path.join(base_dir, nombre_archivo)
+    ruta = ruta_plana + ".gz" if COMPRIMIR else ruta_plana
     os.makedirs(base_dir, exist_ok=True)
 
-    hoy = date.today()
-    y, m = ANIO_INICIO, 1
+    meses = list(generar_meses(date(ANIO_INICIO, 1, 1), date.today()))
 
     header_escrito = False
     filas_escritas = 0
     header_referencia = None
 
-    with io.open(ruta, "w", encoding="utf-8", newline="") as out:
-        while (y < hoy.year) or (y == hoy.year and m <= hoy.month):
-            try:
-                csv_text = descargar_mes(est_id, y, m)
-            except DescargaError as e:
-                sys.stderr.write(f"[WARN] {e}\n")
-                # Continuar con el siguiente mes
-                y, m = (y + 1, 1) if m == 12 else (y, m + 1)
-                time.sleep(RATE_LIMIT_S)
-                continue
-
-            if csv_text:
-                lineas = csv_text.splitlines()
-                # Normalizar fin de línea CRLF -> LF ya lo maneja splitlines()
-                header_actual = lineas[0].replace("\r", "")
-                datos = lineas[1:]  # resto de filas
-
-                if not header_escrito:
-                    out.write(header_actual + "\n")
-                    header_escrito = True
-                    header_referencia = header_actual
-                else:
-                    # Si el encabezado cambió, avisar y continuar (se escriben solo datos)
-                    if header_actual != header_referencia:
-                        sys.stderr.write(
-                            f"[WARN] Encabezado distinto en {est_id}-{nombre} {y}-{m:02d}. "
-                            f"Se omite nuevo encabezado y se anexan datos.\n"
-                        )
-
-                # Escribir filas de datos
-                for row in datos:
-                    if row.strip():
-                        out.write(row.rstrip("\r") + "\n")
-                        filas_escritas += 1
-
-            # rate limit
-            time.sleep(RATE_LIMIT_S)
-
-            # avanzar mes
-            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    # Se escribe a un temporal que reemplaza al archivo recién al terminar: una
+    # corrida cortada no deja un .gz truncado ni pisa la versión anterior.
+    ruta_tmp = ruta + ".tmp"
+    try:
+        # Los meses se descargan en paralelo; map() entrega los resultados en orden,
+        # así el CSV queda cronológico.
+        with ThreadPoolExecutor(max_workers=HILOS_POR_ESTACION) as pool, \
+                abrir_salida(ruta_tmp, COMPRIMIR) as out:
+            resultados = pool.map(lambda ym: intentar_descargar_mes(est_id, *ym), meses)
+            for y, m, csv_data, error in resultados:
+                if error is not None:
+                    sys.stderr.write(f"[WARN] {error}\n")
+                    # Continuar con el siguiente mes
+                    continue
+
+                if csv_data:
+                    # CRLF -> LF ya lo normaliza la lectura en modo texto
+                    lineas = lineas_cp1252(csv_data)
+                    header_actual = next(lineas)
+
+                    if not header_escrito:
+                        out.write(header_actual + "\n")
+                        header_escrito = True
+                        header_referencia = header_actual
+                    else:
+                        # Si el encabezado cambió, avisar y continuar (se escriben solo datos)
+                        if header_actual != header_referencia:
+                            sys.stderr.write(
+                                f"[WARN] Encabezado distinto en {est_id}-{nombre} {y}-{m:02d}. "
+                                f"Se omite nuevo encabezado y se anexan datos.\n"
+                            )
+
+                    # Escribir filas de datos (resto de las líneas) en un único writelines por mes
+                    filas_mes = [row + "\n" for row in lineas if row.strip()]
+                    out.writelines(filas_mes)
+                    filas_escritas += len(filas_mes)
+    except BaseException:
+        borrar_si_existe(ruta_tmp)
+        raise
 
     if filas_escritas == 0:
-        # No quedó nada útil
-        # Borrar archivo vacío/casi vacío (solo header) si existiera
-        try:
-            if os.path.exists(ruta) and os.path.getsize(ruta) <= 128:
-                os.remove(ruta)
-        except OSError:
-            pass
+        # No quedó nada útil: se descarta el temporal (sólo header) y el archivo
+        # anterior, si lo había, queda intacto
+        borrar_si_existe(ruta_tmp)
         raise EstacionSinDatosError(est_id, nombre)
 
+    os.replace(ruta_tmp, ruta)
+
+    # El archivo nuevo reemplaza a cualquier otro de la misma estación: la otra
+    # extensión (.csv <-> .csv.gz) o un nombre anterior (p.ej. '7_Estaci243n_Norte.csv',
+    # de cuando las entidades HTML del nombre llegaban sin decodificar)
+    borrar_otros_de_estacion(base_dir, est_id, os.path.basename(ruta))
+
     return filas_escritas
 
 
+def procesar_estacion(est: dict):
+    """Corre guardar_estacion_csv capturando el error: (est, filas, error)."""
+    try:
+        return est, guardar_estacion_csv(est, SALIDA_DIR), None
+    except Exception as e:
+        return est, 0, e
+
+
 # =========================
 # Programa principal
 # =========================
@@ -313,24 +451,30 @@ def main():
     ok = 0
     skipped = 0
 
-    for idx, est in enumerate(estaciones, start=1):
-        est_id = est["id"]
-        nombre = est["nombre"]
-        tag = est["tag"]
-        print(f"[{idx}/{tot_est}] {est_id} - {nombre} ({tag}) ...", flush=True)
+    # Las estaciones corren en paralelo; el rate limit global sigue acotando los requests
+    with ThreadPoolExecutor(max_workers=ESTACIONES_PARALELAS) as pool:
+        futuros = [pool.submit(procesar_estacion, est) for est in estaciones]
         try:
-            filas = guardar_estacion_csv(est, SALIDA_DIR)
-            print(f"  -> OK, filas escritas: {filas}")
-            ok += 1
-        except EstacionSinDatosError as e:
-            print(f"  -> SIN DATOS ({e})", file=sys.stderr)
-            skipped += 1
-        except DescargaError as e:
-            print(f"  -> ERROR de descarga: {e}", file=sys.stderr)
-            skipped += 1
-        except Exception as e:
-            print(f"  -> ERROR inesperado: {e}", file=sys.stderr)
-            skipped += 1
+            for idx, futuro in enumerate(as_completed(futuros), start=1):
+                est, filas, error = futuro.result()
+                print(f"[{idx}/{tot_est}] {est['id']} - {est['nombre']} ({est['tag']})", flush=True)
+                if error is None:
+                    print(f"  -> OK, filas escritas: {filas}")
+                    ok += 1
+                elif isinstance(error, EstacionSinDatosError):
+                    print(f"  -> SIN DATOS ({error})", file=sys.stderr)
+                    skipped += 1
+                elif isinstance(error, DescargaError):
+                    print(f"  -> ERROR de descarga: {error}", file=sys.stderr)
+                    skipped += 1
+                else:
+                    print(f"  -> ERROR inesperado: {error}", file=sys.stderr)
+                    skipped += 1
+        except KeyboardInterrupt:
+            # no arrancar estaciones pendientes; las que están en curso cortan en el próximo mes
+            DETENER.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
     print("\n== Resumen ==")
     print(f"Estaciones procesadas: {tot_est}")
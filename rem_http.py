@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rem_http.py
+-----------
+Plumbing HTTP compartido por descarga_masiva.py, descarga_incremental.py y
+descarga_coordenadas.py (no se ejecuta solo).
+
+- Conexiones HTTPS persistentes (keep-alive) contra las IPs del host resueltas una sola vez
+- Pool acotado de conexiones compartido por todos los hilos
+- Lectura recortada de respuestas HTML en endpoints que deberían devolver CSV
+- Rate limit global con token bucket
+
+Las conexiones van directo al servidor: a diferencia de urllib, no se usan los
+proxies del entorno (HTTPS_PROXY) y sólo se sigue una redirección por request.
+
+Requisitos: Python 3 estándar (sin dependencias externas)
+"""
+
+import socket
+import ssl
+import threading
+import time
+import http.client
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+
+# DNS resuelto una sola vez por host; las conexiones se abren contra esa IP
+_ips: dict[str, list[str]] = {}
+_ips_lock = threading.Lock()
+_CONTEXTO_TLS = ssl.create_default_context()
+
+REDIRECCIONES = {301, 302, 303, 307, 308}
+
+
+def es_html(data: bytes) -> bool:
+    """Heurística simple para detectar HTML en lugar de CSV."""
+    head = data[:256].lower()
+    return b"<!doctype html" in head or b"<html" in head
+
+class ConexionIPFija(http.client.HTTPSConnection):
+    """
+    HTTPSConnection que se conecta a la IP resuelta una sola vez por host
+    (resolver_host), conservando el hostname para SNI, validación del
+    certificado y el header Host. Si no se puede conectar a ninguna de las
+    IPs cacheadas, se descartan para que la próxima conexión vuelva a resolver.
+    """
+    def connect(self):
+        ultimo_error = None
+        for ip in resolver_host(self.host, self.port):
+            try:
+                sock = socket.create_connection((ip, self.port), self.timeout, self.source_address)
+                break
+            except OSError as e:
+                ultimo_error = e
+        else:
+            olvidar_ip(self.host)
+            raise ultimo_error
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = _CONTEXTO_TLS.wrap_socket(sock, server_hostname=self.host)
+
+def resolver_host(host: str, port: int = 443) -> list[str]:
+    """Resuelve 'host' una única vez (getaddrinfo) y cachea sus IPs, en orden de preferencia."""
+    with _ips_lock:
+        ips = _ips.get(host)
+        if ips is None:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            ips = list(dict.fromkeys(info[4][0] for info in infos))
+            _ips[host] = ips
+        return ips
+
+def olvidar_ip(host: str) -> None:
+    with _ips_lock:
+        _ips.pop(host, None)
+
+def leer_cuerpo(resp: http.client.HTTPResponse, recortar_html: bool) -> bytes:
+    """
+    Lee el cuerpo de la respuesta. Con 'recortar_html', si el Content-Type anuncia
+    HTML se leen sólo los primeros bytes (suficientes para es_html) y, confirmado,
+    el resto se drena sin acumularlo: la conexión queda reutilizable.
+    """
+    if recortar_html and "html" in resp.headers.get("Content-Type", "").lower():
+        cabeza = resp.read(256)
+        if es_html(cabeza):
+            while resp.read(64 * 1024):
+                pass
+            return cabeza
+        return cabeza + resp.read()
+    return resp.read()
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones HTTPS persistentes, compartido por todos los hilos:
+    como mucho 'maximo' requests en vuelo a la vez, sobre sockets que se
+    reutilizan (keep-alive) en vez de uno por hilo. Las ociosas se guardan por
+    host y se entrega primero la última devuelta (la más "caliente").
+    """
+    def __init__(self, maximo: int, ua: str):
+        self.maximo = maximo
+        self.ua = ua
+        self._cupos = threading.BoundedSemaphore(maximo)
+        self._libres: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def tomar(self, host: str, timeout: int, nueva: bool = False):
+        """Bloquea hasta que haya cupo; devuelve una conexión ociosa (salvo 'nueva') o una nueva."""
+        self._cupos.acquire()
+        if not nueva:
+            with self._lock:
+                libres = self._libres.get(host)
+                if libres:
+                    return libres.pop()
+        return ConexionIPFija(host, timeout=timeout)
+
+    def devolver(self, host: str, conn, reutilizable: bool = True):
+        """Libera el cupo; la conexión vuelve al pool o se cierra si quedó inservible."""
+        if reutilizable:
+            with self._lock:
+                libres = self._libres.setdefault(host, [])
+                if len(libres) < self.maximo:
+                    libres.append(conn)
+                    conn = None
+        if conn is not None:
+            conn.close()
+        self._cupos.release()
+
+    def descartar_ociosas(self, host: str):
+        """Cierra las conexiones ociosas de 'host' (tras un rato sin uso el servidor ya las cerró todas)."""
+        with self._lock:
+            libres = self._libres.pop(host, [])
+        for conn in libres:
+            conn.close()
+
+    def get(self, url: str, timeout: int, headers: Optional[dict] = None, recortar_html: bool = False):
+        """
+        GET sobre una conexión persistente del pool. Sigue una única redirección
+        (3xx con Location https); si la respuesta final sigue siendo 3xx se
+        devuelve tal cual y queda en manos de quien llama.
+        Retorna (status, headers_respuesta, data).
+        """
+        status, resp_headers, data = self._get_sin_redireccion(url, timeout, headers, recortar_html)
+        ubicacion = resp_headers.get("Location")
+        if status in REDIRECCIONES and ubicacion:
+            destino = urljoin(url, ubicacion)
+            if destino.startswith("https://"):
+                status, resp_headers, data = self._get_sin_redireccion(destino, timeout, headers, recortar_html)
+        return status, resp_headers, data
+
+    def _get_sin_redireccion(self, url: str, timeout: int, headers: Optional[dict], recortar_html: bool):
+        """
+        Un GET, sin seguir redirecciones. Evita un handshake TCP+TLS por cada
+        request. Si el servidor cerró la conexión ociosa, la descarta junto con
+        las demás ociosas de ese host y reintenta una única vez con una nueva.
+        """
+        partes = urlsplit(url)
+        ruta = f"{partes.path}?{partes.query}" if partes.query else partes.path
+        host = partes.netloc
+        for intento in range(2):
+            conn = self.tomar(host, timeout, nueva=intento > 0)
+            reutilizable = False
+            try:
+                conn.request("GET", ruta, headers={"User-Agent": self.ua, **(headers or {})})
+                resp = conn.getresponse()
+                resultado = resp.status, resp.headers, leer_cuerpo(resp, recortar_html)
+                reutilizable = True
+                return resultado
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # keep-alive vencido del lado del servidor: las otras ociosas
+                # seguramente también, así que el reintento abre una nueva
+                if intento == 1:
+                    raise
+                self.descartar_ociosas(host)
+            finally:
+                self.devolver(host, conn, reutilizable)
+
+class TokenBucket:
+    """
+    Rate limit global compartido por todos los hilos: en régimen permite 'rate'
+    requests por segundo, con ráfagas de hasta 'capacity'. Cada hilo reserva su
+    token bajo el lock y duerme fuera de él lo que le falte (o hasta que se
+    active 'detener', si se pasa).
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+
+    def adquirir(self, detener: Optional[threading.Event] = None):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            self.tokens -= 1
+        if wait:
+            if detener is not None:
+                detener.wait(wait)
+            else:
+                time.sleep(wait)